@@ -26,10 +26,16 @@ TARGET_COLUMNS = [
 
 EXPECTED_COLUMNS = len(TARGET_COLUMNS)
 
+# Rows per multi-row INSERT ... VALUES statement sent by execute_values
+VALUES_PAGE_SIZE = 1000
+
 # ==============================================================================
 # 2. Helpers
 # ==============================================================================
 
+NULL_STRINGS = frozenset({"", "nan"})
+
+
 def clean_value(value):
     """Clean empty/NaN values and strip trailing whitespaces."""
     if pd.isna(value):
@@ -37,7 +43,7 @@ def clean_value(value):
 
     value_str = str(value).strip()
 
-    if value_str.lower() == "nan" or value_str == "":
+    if value_str.lower() in NULL_STRINGS:
         return None
 
     return value_str
@@ -52,16 +58,19 @@ def insert_data_to_db(data_to_insert, db_url):
         conn.autocommit = False
         cursor = conn.cursor()
 
+        cursor.execute("SET LOCAL synchronous_commit = OFF")  # Don't wait for the WAL flush on commit
+
         column_list = ", ".join([f'"{col}"' for col in TARGET_COLUMNS])
-        placeholders = ", ".join(["%s"] * EXPECTED_COLUMNS)
 
+        # one INSERT with VALUES_PAGE_SIZE row tuples per statement (parsed/planned once
+        # per page, not once per row like execute_batch's single-row statements)
         insert_query = f"""
         INSERT INTO {TARGET_TABLE} ({column_list})
-        VALUES ({placeholders})
+        VALUES %s
         """
 
         print(f"Inserting {len(data_to_insert)} rows into '{TARGET_TABLE}'...")
-        extras.execute_batch(cursor, insert_query, data_to_insert)
+        extras.execute_values(cursor, insert_query, data_to_insert, page_size=VALUES_PAGE_SIZE)
 
         conn.commit()
         print("SUCCESS: Insert complete.")
@@ -93,7 +102,13 @@ if __name__ == "__main__":
     print(f"Reading file from {FILE_PATH}...")
 
     try:
-        df = pd.read_excel(FILE_PATH, sheet_name=SHEET_NAME)
+        df = pd.read_excel(
+            FILE_PATH,
+            sheet_name=SHEET_NAME,
+            skiprows=START_ROW_TO_SKIP,
+            usecols=lambda col: col in TARGET_COLUMNS,  # other columns are never materialised
+            engine="calamine"  # python-calamine (Rust) streaming reader instead of openpyxl's DOM
+        )
 
         # Clean string columns
         for col in TARGET_COLUMNS:
@@ -103,25 +118,10 @@ if __name__ == "__main__":
                 print(f"CRITICAL ERROR: Expected column '{col}' not found in the file.")
                 exit()
 
-        # Build records
-        records_to_insert = []
-
-        for index, row in df.iterrows():
-            # Create a tuple of exactly the 4 fields we are inserting
-            data_tuple = (
-                row["institution"],
-                row["zone"],
-                row["district"],
-                row["destination"]
-            )
-
-            # Basic validation
-            if len(data_tuple) == EXPECTED_COLUMNS:
-                # To prevent inserting completely blank rows
-                if any(val is not None for val in data_tuple):
-                    records_to_insert.append(data_tuple)
-            else:
-                print(f"Skipping row {index}: Column mismatch.")
+        # Build records: select TARGET_COLUMNS once (column order = insert order),
+        # drop completely blank rows in one pass, then one plain tuple per row
+        records = df[TARGET_COLUMNS].dropna(how="all")
+        records_to_insert = list(records.itertuples(index=False, name=None))
 
         if records_to_insert:
             insert_data_to_db(records_to_insert, db_url)
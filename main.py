@@ -6,6 +6,10 @@ import os
 from dotenv import load_dotenv
 import uuid 
 import re # For cleaning strings
+import csv # For building the COPY buffer
+import io
+import hashlib # For the Parquet cache key
+from datetime import date
 # Import the extensions module for AsIs
 from psycopg2 import extensions 
 from psycopg2.extensions import AsIs
@@ -32,6 +36,17 @@ TARGET_COLUMNS = [
 ]
 EXPECTED_COLUMNS = len(TARGET_COLUMNS)
 
+# Load via COPY FROM STDIN (one round-trip). Set to False to fall back to execute_values.
+USE_COPY = True
+COPY_NULL = r"\N"
+
+# Rows turned into tuples and sent to the database per batch, so only one batch of
+# tuples is held in memory at a time (all batches share one connection/transaction)
+BATCH_SIZE = 5000
+
+# Trailing ".0" left on numbers Excel stored as floats (pin codes, phone numbers, ...)
+TRAILING_ZERO_RE = re.compile(r'\.0$')
+
 
 # ==============================================================================
 # 2. Helper Functions
@@ -40,31 +55,122 @@ EXPECTED_COLUMNS = len(TARGET_COLUMNS)
 # --- 'adapt_array_literal' function removed ---
 # We will pass the Python list or None directly.
 
-def clean_value(value):
+def clean_series(series):
     """
-    Cleans up the value and handles NaN (empty) inputs from Excel.
+    Cleans up a whole column at once and handles NaN (empty) inputs from Excel.
+    Uses pandas' vectorized string ops instead of a Python call per cell.
     """
-    # 1. Check for pandas NaN or NaT
-    if pd.isna(value):
-        return None
-        
-    # 2. Convert to string, strip whitespace
-    value_str = str(value).strip()
+    # 1. Convert to pandas string dtype (NaN/NaT become <NA>), strip whitespace
+    s = series.astype('string').str.strip()
     
-    # 3. Check if the string is empty or 'nan'
-    if not value_str or value_str.lower() == 'nan':
-        return None
+    # 2. Treat empty strings and 'nan' as missing
+    s = s.mask(s.eq('') | s.str.lower().eq('nan'))
     
-    # 4. Clean .0 from the end (for pin codes, etc.)
-    value_str = re.sub(r'\.0$', '', value_str)
+    # 3. Clean .0 from the end (for pin codes, etc.)
+    s = s.str.replace(TRAILING_ZERO_RE, '', regex=True)
     
-    return value_str
+    # 4. Back to plain Python objects, with None for missing values
+    return s.astype(object).where(s.notna(), None)
 
-def insert_data_to_neon(data_to_insert, db_url):
+def read_excel_cached(file_path, **read_kwargs):
     """
-    Connects to Neon using the full DATABASE_URL string and executes the batch insert.
+    pd.read_excel with a Parquet copy of the result cached next to the workbook.
+    The cache is reused while it is newer than the workbook and was written with
+    the same read arguments; otherwise the sheet is parsed again and re-cached.
+    """
+    key = hashlib.sha1(repr(sorted(read_kwargs.items())).encode()).hexdigest()[:8]
+    cache_path = f"{file_path}.{key}.parquet"
+
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(file_path):
+        try:
+            df = pd.read_parquet(cache_path)
+        except Exception as e:
+            # Unreadable cache (e.g. truncated): parse the workbook again and rewrite it
+            print(f"WARNING: Could not read Parquet cache ({e}). Re-reading the workbook.")
+        else:
+            print(f"Using cached Parquet copy: {cache_path}")
+            # Text columns were cached as pandas strings; hand them back as plain objects
+            text_cols = df.select_dtypes('string').columns
+            df[text_cols] = df[text_cols].astype(object).where(df[text_cols].notna(), None)
+            return df
+
+    df = pd.read_excel(file_path, **read_kwargs)
+    df.columns = df.columns.map(str)
+
+    # Written to a temp file and swapped in, so an interrupted write never leaves
+    # a partial cache behind
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        # Mixed-type Excel columns (numbers + text) are stored as text; every
+        # consumer below stringifies/parses them anyway.
+        object_cols = df.select_dtypes('object').columns
+        df.astype({col: 'string' for col in object_cols}).to_parquet(tmp_path, compression='zstd')
+        os.replace(tmp_path, cache_path)
+    except (ImportError, ValueError, TypeError, OSError) as e:
+        print(f"WARNING: Could not write Parquet cache ({e}). Continuing without it.")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return df
+
+def generate_uuids(count):
+    """
+    Generates `count` random (version 4) UUID strings from a single os.urandom call.
+    """
+    raw = os.urandom(16 * count)
+    return [str(uuid.UUID(bytes=raw[i:i + 16], version=4)) for i in range(0, 16 * count, 16)]
+
+def to_copy_value(value):
+    """
+    Formats one Python value as a field for PostgreSQL's CSV COPY format.
+    """
+    if value is None:
+        return COPY_NULL
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, list):
+        # Python list -> PG array literal, e.g. ['BrandX'] -> {"BrandX"}
+        items = ['"' + str(v).replace('\\', '\\\\').replace('"', '\\"') + '"' for v in value]
+        return "{" + ",".join(items) + "}"
+    return value
+
+def copy_records(cursor, data_to_insert):
+    """
+    Streams all records into TARGET_TABLE with a single COPY FROM STDIN.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf, quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
+    for record in data_to_insert:
+        writer.writerow([to_copy_value(value) for value in record])
+    buf.seek(0)
+
+    column_list = ", ".join([f'"{col}"' for col in TARGET_COLUMNS])
+    copy_query = f"COPY {TARGET_TABLE} ({column_list}) FROM STDIN WITH (FORMAT CSV, NULL '{COPY_NULL}')"
+    cursor.copy_expert(copy_query, buf)
+
+def iter_record_batches(df):
+    """
+    Yields the frame as lists of at most BATCH_SIZE record tuples (TARGET_COLUMNS order),
+    building each batch only when the previous one has been sent.
+    """
+    for start in range(0, len(df), BATCH_SIZE):
+        chunk = df.iloc[start:start + BATCH_SIZE]
+        # Pull each column out once and zip them into row tuples
+        columns = [chunk[col].to_numpy(dtype=object) for col in TARGET_COLUMNS]
+        # Every tuple has one element per column array, so the length is checked once here, not per row
+        assert len(columns) == EXPECTED_COLUMNS
+        yield list(zip(*columns))
+
+def insert_data_to_neon(record_batches, db_url):
+    """
+    Connects to Neon using the full DATABASE_URL string and bulk loads the records
+    batch by batch (COPY FROM STDIN, or execute_values when USE_COPY is False).
+    Everything is committed once, at the end.
     """
     conn = None
+    data_to_insert = []
+    total_inserted = 0
     try:
         print("Connecting to the Neon database...")
         
@@ -73,27 +179,37 @@ def insert_data_to_neon(data_to_insert, db_url):
         
         cursor = conn.cursor()
 
+        # Bulk load: don't wait for the WAL flush at commit (this transaction only).
+        # Worst case on a server crash is losing this load, which can simply be re-run.
+        cursor.execute("SET LOCAL synchronous_commit = OFF")
+
         # The INSERT query template
         column_list = ", ".join([f'"{col}"' for col in TARGET_COLUMNS])
-        placeholders = ', '.join(['%s'] * EXPECTED_COLUMNS)
-        insert_query = f"INSERT INTO {TARGET_TABLE} ({column_list}) VALUES ({placeholders})"
-        
-        print(f"\n--- DEBUG: Sample of data prepared for insertion (First 3 records) ---")
-        for i, record in enumerate(data_to_insert[:3]):
-            print(f"Record {i+1} (Length {len(record)}/{EXPECTED_COLUMNS}): {record}")
-        print("------------------------------------------------------------------\n")
-        
-        print(f"Executing batch insert of {len(data_to_insert)} rows...")
+        insert_query = f"INSERT INTO {TARGET_TABLE} ({column_list}) VALUES %s"
         
-        extras.execute_batch(cursor, insert_query, data_to_insert)
+        for data_to_insert in record_batches:
+            if total_inserted == 0:
+                print(f"\n--- DEBUG: Sample of data prepared for insertion (First 3 records) ---")
+                for i, record in enumerate(data_to_insert[:3]):
+                    print(f"Record {i+1} (Length {len(record)}/{EXPECTED_COLUMNS}): {record}")
+                print("------------------------------------------------------------------\n")
+            
+            print(f"Executing bulk load of {len(data_to_insert)} rows (rows {total_inserted + 1}-{total_inserted + len(data_to_insert)})...")
+            
+            if USE_COPY:
+                copy_records(cursor, data_to_insert)
+            else:
+                extras.execute_values(cursor, insert_query, data_to_insert, page_size=1000)
+            
+            total_inserted += len(data_to_insert)
         
         conn.commit()
-        print(f"SUCCESS: Successfully inserted {len(data_to_insert)} records into '{TARGET_TABLE}'.")
+        print(f"SUCCESS: Successfully inserted {total_inserted} records into '{TARGET_TABLE}'.")
 
     except psycopg2.Error as e:
         print(f"DATABASE INSERTION FAILED:")
         print(f"PostgreSQL Error Message: {e}")
-        print("\n--- ERROR DEBUG: Sample of data that failed insertion (First 5 records) ---")
+        print("\n--- ERROR DEBUG: Sample of the batch that failed insertion (First 5 records) ---")
         for i, record in enumerate(data_to_insert[:5]):
             print(f"Record {i+1} (Length {len(record)}): {record}")
         print("------------------------------------------------------------------\n")
@@ -104,8 +220,6 @@ def insert_data_to_neon(data_to_insert, db_url):
         print(f"An unexpected Python execution error occurred: {e}")
         print(f"\n--- ACTION REQUIRED: Check all {EXPECTED_COLUMNS} elements of the data tuples below ---")
         for i, record in enumerate(data_to_insert[:5]):
-            if len(record) != EXPECTED_COLUMNS:
-                print(f"CRITICAL LENGTH ERROR AT RECORD {i+1}. Expected {EXPECTED_COLUMNS}, got {len(record)}.")
             print(f"Record {i+1} Types: {tuple(type(item).__name__ for item in record)}")
             print(f"Record {i+1} Data: {record}")
         print("------------------------------------------------------------------\n")
@@ -133,12 +247,12 @@ if __name__ == "__main__":
     try:
         print(f"Reading data from: {FILE_PATH} (Sheet: {SHEET_NAME})...")
         
-        df = pd.read_excel(
+        df = read_excel_cached(
             FILE_PATH, 
             sheet_name=SHEET_NAME, 
             skiprows=START_ROW_TO_SKIP, 
             header=None, 
-            engine='openpyxl'
+            engine='calamine'  # Rust-backed reader (python-calamine), much faster than openpyxl
         )
 
         df = df.iloc[:, :24]
@@ -147,92 +261,61 @@ if __name__ == "__main__":
             "user_id", "type", "parent_dealer_id", "name", "region", "area", "phone_no", 
             "address", "total_potential", "best_potential", "brand_selling", "feedbacks",
             "remarks", "pinCode", "dateOfBirth", "anniversaryDate", "latitude", "longitude",
-            "verificationStatus", "business_type", "nameOfFirm", "underSalesPromoterName", 
+            "verification_status", "business_type", "nameOfFirm", "underSalesPromoterName", 
             "gstin_no", "pan_no"
         ]
         
         # === Explicit Type Casting to ensure data integrity for PostgreSQL ===
         
         numeric_cols = ['user_id', 'total_potential', 'best_potential']
-        for col in numeric_cols:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
+        df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce').fillna(0).astype('int64')
         
         numeric_float_cols = ['latitude', 'longitude']
-        for col in numeric_float_cols:
-             df[col] = pd.to_numeric(df[col], errors='coerce').apply(lambda x: None if pd.isna(x) else x)
+        coords = df[numeric_float_cols].apply(pd.to_numeric, errors='coerce')
+        # NaN -> None in one pass (object dtype, so pandas doesn't turn None back into NaN)
+        df[numeric_float_cols] = coords.astype(object).where(coords.notna(), None)
 
-        # Ensure phone_no is treated as a string
-        df['phone_no'] = df['phone_no'].astype(str).str.replace(r'\.0$', '', regex=True).fillna('')
+        # Ensure phone_no is treated as a string (empty string, not NULL, when missing)
+        phone = df['phone_no'].astype('string').str.strip().str.replace(TRAILING_ZERO_RE, '', regex=True)
+        df['phone_no'] = phone.where(phone.notna() & (phone.str.lower() != 'nan'), '').fillna('')
         
         # !!! FIX: Create a separate list for date columns
         date_cols = ['dateOfBirth', 'anniversaryDate']
         for col in date_cols:
             # Convert to datetime, letting errors become NaT (Not a Time)
-            df[col] = pd.to_datetime(df[col], errors='coerce')
-            # Convert any valid dates to Python date objects, and NaT to None
-            df[col] = df[col].apply(lambda x: x.date() if pd.notnull(x) else None)
+            # format='mixed': each value is parsed on its own, so Excel date cells, text
+            # dates and their cached string form all give the same date
+            dates = pd.to_datetime(df[col], errors='coerce', format='mixed')
+            # Convert any valid dates to Python date objects (vectorized .dt.date), and NaT to None
+            df[col] = dates.dt.date.astype(object).where(dates.notna(), None)
 
         # !!! FIX: Remove date_cols from the string_cols list
         string_cols = [
             'type', 'parent_dealer_id', 'name', 'region', 'area', 'address', 'feedbacks', 'remarks', 
-            'pinCode', 'verificationStatus', 'business_type', 'nameOfFirm', 
+            'pinCode', 'verification_status', 'business_type', 'nameOfFirm', 
             'underSalesPromoterName', 'gstin_no', 'pan_no'
         ]
         for col in string_cols:
-            # Apply the improved clean_value function
-            df[col] = df[col].apply(clean_value)
+            # Apply the vectorized clean_series function
+            df[col] = clean_series(df[col])
         
-        # Process the DataFrame into a list of tuples suitable for batch insertion
-        records_to_insert = []
-        for index, row in df.iterrows():
-            
-            # --- Brand Selling Array Formatting ---
-            brand_selling_value = row['brand_selling']
-            
-            if pd.isna(brand_selling_value) or brand_selling_value is None or str(brand_selling_value).strip().lower() == 'nan':
-                brand_list_or_none = None
-            else:
-                brand_list_or_none = [str(brand_selling_value).strip()]
-
-            data_tuple = (
-                str(uuid.uuid4()),  # 1. id
-                row['user_id'],     # 2. user_id
-                row['type'],        # 3. type
-                row['parent_dealer_id'], # 4. parent_dealer_id
-                row['name'],        # 5. name
-                row['region'],      # 6. region
-                row['area'],        # 7. area
-                row['phone_no'],    # 8. phone_no
-                row['address'],     # 9. address
-                row['total_potential'], # 10. total_potential
-                row['best_potential'],  # 11. best_potential
-                brand_list_or_none,     # 12. brand_selling
-                row['feedbacks'],   # 13. feedbacks
-                row['remarks'],     # 14. remarks
-                row['pinCode'],     # 15. pinCode
-                row['dateOfBirth'], # 16. dateOfBirth (will be None or a date object)
-                row['anniversaryDate'], # 17. anniversaryDate (will be None or a date object)
-                row['latitude'],    # 18. latitude
-                row['longitude'],   # 19. longitude
-                row['verificationStatus'], # 20. verification_status
-                row['business_type'], # 21. business_type
-                row['nameOfFirm'],  # 22. nameOfFirm
-                row['underSalesPromoterName'], # 23. underSalesPromoterName
-                row['gstin_no'],    # 24. gstin_no
-                row['pan_no']       # 25. pan_no
-            )
-            
-            if len(data_tuple) != EXPECTED_COLUMNS:
-                print(f"SKIPPING ROW {index+START_ROW_TO_SKIP+1}: Incorrect tuple length.")
-                continue
-                
-            records_to_insert.append(data_tuple)
+        # --- Brand Selling Array Formatting (whole column at once) ---
+        # Each cell becomes a one-element list (PG text[]) or None
+        brands = df['brand_selling'].astype('string').str.strip()
+        no_brand = brands.isna() | brands.str.lower().eq('nan') | brands.eq('')
+        df['brand_selling'] = [
+            None if missing else [brand]
+            for missing, brand in zip(no_brand.to_numpy(dtype=bool, na_value=True), brands.to_numpy(dtype=object))
+        ]
+        
+        # One UUID per dealer, generated for the whole frame up front
+        df['id'] = generate_uuids(len(df))
         
-        # 3c. Insert data
-        if records_to_insert:
-            insert_data_to_neon(records_to_insert, db_url)
+        # 3c. Insert data (tuples are built batch by batch inside the insert)
+        if len(df):
+            insert_data_to_neon(iter_record_batches(df), db_url)
         else:
-            print("INFO: No valid records found to insert after skipping rows.")
+            print("INFO: No records found to insert.")
 
     except FileNotFoundError:
         print(f"ERROR: File not found at the specified path: {FILE_PATH}")
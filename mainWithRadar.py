@@ -8,6 +8,13 @@ import uuid
 import re 
 import json # Required for Radar Metadata
 import requests # Required for Radar API calls
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry # Backoff/Retry-After for rate-limited Radar calls
+from concurrent.futures import ThreadPoolExecutor, as_completed # Parallel Radar upserts
+import csv # For building the COPY buffer
+import io
+import hashlib # Parquet cache key
+from datetime import date
 from psycopg2 import extensions 
 from psycopg2.extensions import AsIs
 
@@ -30,22 +37,108 @@ TARGET_COLUMNS = [
 ]
 EXPECTED_COLUMNS = len(TARGET_COLUMNS)
 
+# Load via COPY FROM STDIN (one round-trip). Set to False to fall back to execute_values.
+USE_COPY = True
+COPY_NULL = r"\N"
+TRAILING_ZERO_RE = re.compile(r'\.0$')
+
+# Radar upserts are independent HTTP calls: run them on a thread pool over a shared keep-alive session.
+# At most RADAR_CONCURRENCY requests are in flight, each with its own pooled connection.
+RADAR_CONCURRENCY = 64
+RADAR_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}  # + Authorization at runtime
+RADAR_TIMEOUT = (5, 30)  # (connect, read) seconds per request, so a stalled call can't hang a worker
+# With this many calls in flight Radar may answer 429: retry those (and transient gateway errors)
+# with exponential backoff, waiting for Retry-After when given. The PUT upsert is idempotent.
+RADAR_RETRY = Retry(
+    total=5,
+    backoff_factor=1,
+    status_forcelist=[429, 502, 503, 504],
+    allowed_methods={"PUT"},
+    respect_retry_after_header=True,
+    raise_on_status=False  # after the last retry, report the final status like any other failure
+)
+
 # ==============================================================================
 # 2. Helper Functions
 # ==============================================================================
 
-def clean_value(value):
-    if pd.isna(value): return None
-    value_str = str(value).strip()
-    if not value_str or value_str.lower() == 'nan': return None
-    value_str = re.sub(r'\.0$', '', value_str)
-    return value_str
+def read_excel_cached(file_path, **read_kwargs):
+    # pd.read_excel + Parquet cache next to the workbook (reused while newer than the
+    # workbook and written with the same read arguments)
+    key = hashlib.sha1(repr(sorted(read_kwargs.items())).encode()).hexdigest()[:8]
+    cache_path = f"{file_path}.{key}.parquet"
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(file_path):
+        try:
+            df = pd.read_parquet(cache_path)
+        except Exception as e:
+            print(f"WARNING: Could not read Parquet cache ({e}), re-reading the workbook")
+        else:
+            print(f"Using cached Parquet copy: {cache_path}")
+            text_cols = df.select_dtypes('string').columns
+            df[text_cols] = df[text_cols].astype(object).where(df[text_cols].notna(), None)
+            return df
+
+    df = pd.read_excel(file_path, **read_kwargs)
+    df.columns = df.columns.map(str)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"  # swapped in whole: no partial cache on interrupt
+    try:
+        # Mixed-type columns are cached as text (they get stringified/parsed below anyway)
+        object_cols = df.select_dtypes('object').columns
+        df.astype({col: 'string' for col in object_cols}).to_parquet(tmp_path, compression='zstd')
+        os.replace(tmp_path, cache_path)
+    except (ImportError, ValueError, TypeError, OSError) as e:
+        print(f"WARNING: Could not write Parquet cache ({e})")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return df
+
+def generate_uuids(count):
+    # Batch of uuid4 strings from one os.urandom call instead of one per row
+    raw = os.urandom(16 * count)
+    return [str(uuid.UUID(bytes=raw[i:i + 16], version=4)) for i in range(0, 16 * count, 16)]
+
+def clean_series(series):
+    # Whole-column clean-up: strip, '' / 'nan' -> None, drop trailing .0 (pandas string ops, no per-cell Python call)
+    s = series.astype('string').str.strip()
+    s = s.mask(s.eq('') | s.str.lower().eq('nan'))
+    s = s.str.replace(TRAILING_ZERO_RE, '', regex=True)
+    return s.astype(object).where(s.notna(), None)
+
+def to_copy_value(value):
+    """
+    Formats one Python value as a field for PostgreSQL's CSV COPY format.
+    """
+    if value is None:
+        return COPY_NULL
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, list):
+        # Python list -> PG array literal, e.g. ['BrandX'] -> {"BrandX"}
+        items = ['"' + str(v).replace('\\', '\\\\').replace('"', '\\"') + '"' for v in value]
+        return "{" + ",".join(items) + "}"
+    return value
+
+def copy_records(cursor, data_to_insert):
+    """
+    Streams all records into TARGET_TABLE with a single COPY FROM STDIN.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf, quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
+    for record in data_to_insert:
+        writer.writerow([to_copy_value(value) for value in record])
+    buf.seek(0)
+
+    column_list = ", ".join([f'"{col}"' for col in TARGET_COLUMNS])
+    copy_query = f"COPY {TARGET_TABLE} ({column_list}) FROM STDIN WITH (FORMAT CSV, NULL '{COPY_NULL}')"
+    cursor.copy_expert(copy_query, buf)
 
 # --- NEW: RADAR GEOFENCE FUNCTION ---
-def upsert_radar_geofence(dealer_data, secret_key):
+def upsert_radar_geofence(dealer_data, session):
     """
     Creates/Updates a geofence in Radar.io matching the TypeScript logic.
-    dealer_data is the tuple created in the main loop.
+    dealer_data is the tuple created in the main loop; session is the shared requests.Session
+    (keep-alive connections, auth headers already set).
     """
     # Extract data using the tuple indices based on TARGET_COLUMNS order
     dealer_id = dealer_data[0]
@@ -63,12 +156,8 @@ def upsert_radar_geofence(dealer_data, secret_key):
         print(f"Skipping Radar for Dealer ID {dealer_id}: Missing Coordinates")
         return False
 
-    # 1. API Configuration
+    # 1. API Configuration (headers live on the session)
     url = f"https://api.radar.io/v1/geofences/dealer/dealer:{dealer_id}"
-    headers = {
-        "Authorization": secret_key,
-        "Content-Type": "application/x-www-form-urlencoded"
-    }
 
     # 2. Prepare Metadata (Matches TS: dealerId, userId, region, area, phoneNo, verificationStatus)
     metadata = {
@@ -86,15 +175,15 @@ def upsert_radar_geofence(dealer_data, secret_key):
     payload = {
     "description": str(name)[:120],               # Name as description
     "type": "circle",
-    "coordinates": json.dumps([float(longitude), float(latitude)]),  # [lng, lat]
+    "coordinates": f"[{float(longitude)},{float(latitude)}]",  # [lng, lat] (JSON array, no json.dumps)
     "radius": "50",                               # meters
     "tag": "dealer",                              # <- tag = dealer
     "externalId": f"dealer:{dealer_id}",          # <- externalId = dealer:<neon_uuid>
-    "metadata": json.dumps(metadata)
+    "metadata": json.dumps(metadata, separators=(',', ':'), default=str)
  }
 
     try:
-        response = requests.put(url, headers=headers, data=payload)
+        response = session.put(url, data=payload, timeout=RADAR_TIMEOUT)
         if response.status_code in [200, 201]:
             # print(f"Radar Success: {name}") 
             return True
@@ -116,13 +205,18 @@ def insert_data_to_neon(data_to_insert, db_url, radar_key):
         conn.autocommit = False 
         cursor = conn.cursor()
 
+        # Bulk load: skip waiting for the WAL flush at commit (this transaction only; re-run on crash)
+        cursor.execute("SET LOCAL synchronous_commit = OFF")
+
         # --- STEP 1: DATABASE INSERT ---
         column_list = ", ".join([f'"{col}"' for col in TARGET_COLUMNS])
-        placeholders = ', '.join(['%s'] * EXPECTED_COLUMNS)
-        insert_query = f"INSERT INTO {TARGET_TABLE} ({column_list}) VALUES ({placeholders})"
+        insert_query = f"INSERT INTO {TARGET_TABLE} ({column_list}) VALUES %s"
         
-        print(f"Executing batch insert of {len(data_to_insert)} rows into PostgreSQL...")
-        extras.execute_batch(cursor, insert_query, data_to_insert)
+        print(f"Executing bulk load of {len(data_to_insert)} rows into PostgreSQL...")
+        if USE_COPY:
+            copy_records(cursor, data_to_insert)
+        else:
+            extras.execute_values(cursor, insert_query, data_to_insert, page_size=1000)
         conn.commit()
         print(f"✅ DB SUCCESS: Inserted {len(data_to_insert)} records into '{TARGET_TABLE}'.")
 
@@ -130,14 +224,32 @@ def insert_data_to_neon(data_to_insert, db_url, radar_key):
         if radar_key:
             print("\n--- Starting Radar.io Geofence Import ---")
             success_count = 0
-            for i, record in enumerate(data_to_insert):
-                # record is the tuple
-                if upsert_radar_geofence(record, radar_key):
-                    success_count += 1
-                
-                # Optional: Progress indicator every 50 records
-                if (i + 1) % 50 == 0:
-                    print(f"Processed {i + 1}/{len(data_to_insert)} Radar records...")
+
+            # One keep-alive session for the whole import: TCP+TLS handshakes happen once per
+            # pooled connection, not once per record. Closed (with its pool) when done.
+            with requests.Session() as session:
+                session.headers.update(RADAR_HEADERS)
+                session.headers["Authorization"] = radar_key
+                adapter = HTTPAdapter(
+                    pool_connections=RADAR_CONCURRENCY,
+                    pool_maxsize=RADAR_CONCURRENCY,
+                    max_retries=RADAR_RETRY
+                )
+                session.mount("https://", adapter)
+
+                with ThreadPoolExecutor(max_workers=RADAR_CONCURRENCY) as executor:
+                    # record is the tuple
+                    futures = [
+                        executor.submit(upsert_radar_geofence, record, session)
+                        for record in data_to_insert
+                    ]
+                    for i, future in enumerate(as_completed(futures)):
+                        if future.result():
+                            success_count += 1
+                        
+                        # Optional: Progress indicator every 50 records
+                        if (i + 1) % 50 == 0:
+                            print(f"Processed {i + 1}/{len(data_to_insert)} Radar records...")
 
             print(f"✅ RADAR SUCCESS: Created {success_count} geofences out of {len(data_to_insert)} records.")
         else:
@@ -176,12 +288,12 @@ if __name__ == "__main__":
     try:
         print(f"Reading data from: {FILE_PATH} (Sheet: {SHEET_NAME})...")
         
-        df = pd.read_excel(
+        df = read_excel_cached(
             FILE_PATH, 
             sheet_name=SHEET_NAME, 
             skiprows=START_ROW_TO_SKIP, 
             header=None, 
-            engine='openpyxl'
+            engine='calamine'  # Rust-backed reader (python-calamine), much faster than openpyxl
         )
 
         df = df.iloc[:, :24]
@@ -190,87 +302,58 @@ if __name__ == "__main__":
             "user_id", "type", "parent_dealer_id", "name", "region", "area", "phone_no", 
             "address", "total_potential", "best_potential", "brand_selling", "feedbacks",
             "remarks", "pinCode", "dateOfBirth", "anniversaryDate", "latitude", "longitude",
-            "verificationStatus", "business_type", "nameOfFirm", "underSalesPromoterName", 
+            "verification_status", "business_type", "nameOfFirm", "underSalesPromoterName", 
             "gstin_no", "pan_no"
         ]
         
         # === Explicit Type Casting ===
         numeric_cols = ['user_id', 'total_potential', 'best_potential']
-        for col in numeric_cols:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
+        df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce').fillna(0).astype('int64')
         
         numeric_float_cols = ['latitude', 'longitude']
-        for col in numeric_float_cols:
-             df[col] = pd.to_numeric(df[col], errors='coerce').apply(lambda x: None if pd.isna(x) else x)
+        coords = df[numeric_float_cols].apply(pd.to_numeric, errors='coerce')
+        # NaN -> None in one pass (object dtype, so pandas doesn't turn None back into NaN)
+        df[numeric_float_cols] = coords.astype(object).where(coords.notna(), None)
 
-        df['phone_no'] = df['phone_no'].apply(clean_value)
-        df['phone_no'] = df['phone_no'].fillna('')
+        phone = df['phone_no'].astype('string').str.strip().str.replace(TRAILING_ZERO_RE, '', regex=True)
+        df['phone_no'] = phone.where(phone.notna() & (phone.str.lower() != 'nan'), '').fillna('')
 
         
         date_cols = ['dateOfBirth', 'anniversaryDate']
         for col in date_cols:
-            df[col] = pd.to_datetime(df[col], errors='coerce')
-            df[col] = df[col].apply(lambda x: x.date() if pd.notnull(x) else None)
+            # per-value parsing: cold (date cells) and warm (cached text) runs agree
+            dates = pd.to_datetime(df[col], errors='coerce', format='mixed')
+            df[col] = dates.dt.date.astype(object).where(dates.notna(), None)
 
         string_cols = [
             'type', 'parent_dealer_id', 'name', 'region', 'area', 'address', 'feedbacks', 'remarks', 
-            'pinCode', 'verificationStatus', 'business_type', 'nameOfFirm', 
+            'pinCode', 'verification_status', 'business_type', 'nameOfFirm', 
             'underSalesPromoterName', 'gstin_no', 'pan_no'
         ]
         for col in string_cols:
-            df[col] = df[col].apply(clean_value)
+            df[col] = clean_series(df[col])
+
+        # brand_selling -> one-element list (PG text[]) or None, for the whole column at once
+        brands = df['brand_selling'].astype('string').str.strip()
+        no_brand = brands.isna() | brands.str.lower().eq('nan') | brands.eq('')
+        df['brand_selling'] = [
+            None if missing else [brand]
+            for missing, brand in zip(no_brand.to_numpy(dtype=bool, na_value=True), brands.to_numpy(dtype=object))
+        ]
+
+        # GENERATING UUIDS HERE (one batch for all dealers)
+        df['id'] = generate_uuids(len(df))
         
-        records_to_insert = []
-        for index, row in df.iterrows():
-            
-            brand_selling_value = row['brand_selling']
-            if pd.isna(brand_selling_value) or brand_selling_value is None or str(brand_selling_value).strip().lower() == 'nan':
-                brand_list_or_none = None
-            else:
-                brand_list_or_none = [str(brand_selling_value).strip()]
-
-            # GENERATING UUID HERE
-            new_dealer_uuid = str(uuid.uuid4())
-
-            data_tuple = (
-                new_dealer_uuid,    # 1. id
-                row['user_id'],     # 2. user_id
-                row['type'],        # 3. type
-                row['parent_dealer_id'], # 4. parent_dealer_id
-                row['name'],        # 5. name
-                row['region'],      # 6. region
-                row['area'],        # 7. area
-                row['phone_no'],    # 8. phone_no
-                row['address'],     # 9. address
-                row['total_potential'], # 10. total_potential
-                row['best_potential'],  # 11. best_potential
-                brand_list_or_none,     # 12. brand_selling
-                row['feedbacks'],   # 13. feedbacks
-                row['remarks'],     # 14. remarks
-                row['pinCode'],     # 15. pinCode
-                row['dateOfBirth'], # 16. dateOfBirth
-                row['anniversaryDate'], # 17. anniversaryDate
-                row['latitude'],    # 18. latitude
-                row['longitude'],   # 19. longitude
-                row['verificationStatus'], # 20. verification_status
-                row['business_type'], # 21. business_type
-                row['nameOfFirm'],  # 22. nameOfFirm
-                row['underSalesPromoterName'], # 23. underSalesPromoterName
-                row['gstin_no'],    # 24. gstin_no
-                row['pan_no']       # 25. pan_no
-            )
-            
-            if len(data_tuple) != EXPECTED_COLUMNS:
-                print(f"SKIPPING ROW: Incorrect tuple length.")
-                continue
-                
-            records_to_insert.append(data_tuple)
+        # Column arrays in TARGET_COLUMNS order -> row tuples (upsert_radar_geofence relies on this order)
+        columns = [df[col].to_numpy(dtype=object) for col in TARGET_COLUMNS]
+        assert len(columns) == EXPECTED_COLUMNS  # checked once for all tuples, not per row
+        records_to_insert = list(zip(*columns))
         
         # 3c. Insert data (SQL + Radar)
         if records_to_insert:
             insert_data_to_neon(records_to_insert, db_url, radar_key)
         else:
-            print("INFO: No valid records found to insert.")
+            print("INFO: No records found to insert.")
 
     except FileNotFoundError:
         print(f"ERROR: File not found: {FILE_PATH}")
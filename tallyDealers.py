@@ -4,6 +4,9 @@ from psycopg2 import extras
 import os
 from dotenv import load_dotenv
 import re
+import csv
+import io
+import hashlib
 
 # ==============================================================================
 # 1. CONFIG
@@ -63,39 +66,104 @@ TARGET_COLUMNS = [
 
 EXPECTED_COLUMNS = len(TARGET_COLUMNS)
 
+# Load via COPY FROM STDIN (one round-trip). Set to False to fall back to execute_values.
+USE_COPY = True
+COPY_NULL = r"\N"
+
+# Rows are turned into tuples and sent per batch (one connection, one commit),
+# so only BATCH_SIZE tuples are in memory at a time
+BATCH_SIZE = 5000
+
+# float junk left on numbers stored as float ("560001.0"), compiled once
+TRAILING_ZERO_RE = re.compile(r'\.0$')
+
 # ==============================================================================
 # 2. HELPERS
 # ==============================================================================
 
-def clean_value(value):
-    if pd.isna(value):
-        return None
+def read_excel_cached(file_path, **read_kwargs):
+    # pd.read_excel, cached as Parquet next to the workbook until the workbook changes
+    key = hashlib.sha1(repr(sorted(read_kwargs.items())).encode()).hexdigest()[:8]
+    cache_path = f"{file_path}.{key}.parquet"
 
-    val = str(value).strip()
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(file_path):
+        try:
+            df = pd.read_parquet(cache_path)
+        except Exception as e:
+            # unreadable (e.g. truncated) cache: re-read the workbook and rewrite it
+            print("WARNING: Parquet cache not readable, re-reading the workbook:", e)
+        else:
+            print(f"Using cached Parquet copy: {cache_path}")
 
-    if val.lower() == "nan" or val == "":
-        return None
+            text_cols = df.select_dtypes("string").columns
+            df[text_cols] = df[text_cols].astype(object).where(df[text_cols].notna(), None)
 
-    # remove float junk
-    val = re.sub(r'\.0$', '', val)
+            return df
 
-    return val
+    df = pd.read_excel(file_path, **read_kwargs)
+    df.columns = df.columns.map(str)
 
+    # write to a temp file and swap it in, so an interrupted write leaves no partial cache
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
 
-def clean_numeric(value):
-    if pd.isna(value):
-        return None
     try:
-        return float(value)
-    except:
-        return None
+        # mixed-type columns are cached as text; cleaning stringifies them anyway
+        object_cols = df.select_dtypes("object").columns
+        df.astype({col: "string" for col in object_cols}).to_parquet(tmp_path, compression="zstd")
+        os.replace(tmp_path, cache_path)
+    except (ImportError, ValueError, TypeError, OSError) as e:
+        print("WARNING: Parquet cache not written:", e)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return df
+
+
+def clean_series(series):
+    # vectorized: whole column through pandas string ops
+    s = series.astype("string").str.strip()
+
+    s = s.mask(s.str.lower().eq("nan") | s.eq(""))
+
+    # remove float junk (missing stays <NA>; turned into None when records are built)
+    return s.str.replace(TRAILING_ZERO_RE, '', regex=True)
+
+
+def clean_numeric_series(series):
+    # vectorized float(value): anything non-numeric becomes NaN (-> None when records are built)
+    return pd.to_numeric(series, errors="coerce").astype("float64")
+
+
+def copy_records(cursor, data_to_insert):
+    buf = io.StringIO()
+    writer = csv.writer(buf, quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
+
+    for record in data_to_insert:
+        writer.writerow([COPY_NULL if value is None else value for value in record])
+
+    buf.seek(0)
+
+    column_list = ", ".join([f'"{col}"' for col in TARGET_COLUMNS])
+    copy_query = f"COPY {TARGET_TABLE} ({column_list}) FROM STDIN WITH (FORMAT CSV, NULL '{COPY_NULL}')"
+    cursor.copy_expert(copy_query, buf)
 
 
 # ==============================================================================
 # 3. INSERT
 # ==============================================================================
 
-def insert_data_to_neon(data_to_insert, db_url):
+def iter_record_batches(df):
+    records = df.reindex(columns=TARGET_COLUMNS)
+
+    for start in range(0, len(records), BATCH_SIZE):
+        chunk = records.iloc[start:start + BATCH_SIZE]
+        # NaN / <NA> -> None for psycopg2 / COPY in one vectorized pass per batch
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        yield list(chunk.itertuples(index=False, name=None))
+
+
+def insert_data_to_neon(record_batches, db_url):
 
     conn = None
 
@@ -105,25 +173,34 @@ def insert_data_to_neon(data_to_insert, db_url):
         conn.autocommit = False
         cursor = conn.cursor()
 
-        column_list = ", ".join([f'"{col}"' for col in TARGET_COLUMNS])
-        placeholders = ", ".join(["%s"] * EXPECTED_COLUMNS)
+        # bulk load: no WAL flush wait at commit, scoped to this transaction
+        cursor.execute("SET LOCAL synchronous_commit = OFF")
 
+        column_list = ", ".join([f'"{col}"' for col in TARGET_COLUMNS])
         insert_query = f"""
         INSERT INTO {TARGET_TABLE} ({column_list})
-        VALUES ({placeholders})
+        VALUES %s
         """
 
-        print(f"Inserting {len(data_to_insert)} rows...")
+        total_inserted = 0
+
+        for data_to_insert in record_batches:
+            print(f"Inserting {len(data_to_insert)} rows...")
+
+            if USE_COPY:
+                copy_records(cursor, data_to_insert)
+            else:
+                extras.execute_values(
+                    cursor,
+                    insert_query,
+                    data_to_insert,
+                    page_size=1000
+                )
 
-        extras.execute_batch(
-            cursor,
-            insert_query,
-            data_to_insert,
-            page_size=500
-        )
+            total_inserted += len(data_to_insert)
 
         conn.commit()
-        print("SUCCESS: Bulk insert completed.")
+        print(f"SUCCESS: Bulk insert completed ({total_inserted} rows).")
 
     except psycopg2.Error as e:
         print("DATABASE ERROR:", e)
@@ -151,11 +228,11 @@ if __name__ == "__main__":
 
     print("Reading Excel...")
 
-    df = pd.read_excel(
+    df = read_excel_cached(
         FILE_PATH,
         sheet_name=SHEET_NAME,
         skiprows=START_ROW_TO_SKIP,
-        engine="openpyxl"
+        engine="calamine"  # python-calamine (Rust) instead of pure-Python openpyxl
     )
 
     # --------------------------------------------------------------------------
@@ -182,28 +259,23 @@ if __name__ == "__main__":
     string_cols = [c for c in TARGET_COLUMNS if c != "cr_limit"]
 
     for col in string_cols:
-        df[col] = df[col].apply(clean_value)
+        df[col] = clean_series(df[col])
 
-    df["cr_limit"] = df["cr_limit"].apply(clean_numeric)
+    df["cr_limit"] = clean_numeric_series(df["cr_limit"])
 
     # --------------------------------------------------------------------------
     # BUILD RECORDS
     # --------------------------------------------------------------------------
 
-    records_to_insert = []
-
-    for _, row in df.iterrows():
-
-        data_tuple = tuple(row.get(col) for col in TARGET_COLUMNS)
-
-        if len(data_tuple) == EXPECTED_COLUMNS:
-            records_to_insert.append(data_tuple)
+    # plain tuples in TARGET_COLUMNS order straight from pandas' C-level
+    # iterator, built one batch at a time while inserting
+    record_batches = iter_record_batches(df)
 
     # --------------------------------------------------------------------------
     # EXECUTE
     # --------------------------------------------------------------------------
 
-    if records_to_insert:
-        insert_data_to_neon(records_to_insert, db_url)
+    if len(df):
+        insert_data_to_neon(record_batches, db_url)
     else:
         print("No valid rows found.")
\ No newline at end of file
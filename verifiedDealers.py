@@ -1,9 +1,17 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import psycopg2
-from psycopg2 import extras
+from psycopg2 import extras, pool
 import os
 from dotenv import load_dotenv
 import re
+import csv
+import io
+import hashlib
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # ==============================================================================
 # 1. Configuration
@@ -30,63 +38,295 @@ TARGET_COLUMNS = [
 
 EXPECTED_COLUMNS = len(TARGET_COLUMNS)
 
+# Rows missing any of these (after cleaning) are skipped
+REQUIRED_COLUMNS = ["dealer_party_name"]
+
+# --- Excel header → DB column name ---
+# Only the columns that are inserted are parsed and cleaned; the rest of the
+# sheet (dealerCode, isSubdealer, address, ...) is never loaded.
+EXCEL_COLUMNS = {
+    "dealerPartyName": "dealer_party_name",
+    "zone": "zone",
+    "area": "area",
+    "contactNo1": "contact_no1",
+    "contactNo2": "contact_no2",
+    "email": "email",
+    "pinCode": "pin_code",
+    "gstNo": "gst_no",
+    "panNo": "pan_no"
+}
+
+# How batches are loaded:
+#   "copy"   - one COPY FROM STDIN for all batches (fastest)
+#   "unnest" - one INSERT ... SELECT FROM UNNEST per batch, one text[] parameter per column
+#   "values" - execute_values multi-row INSERT ... VALUES
+LOAD_METHOD = "copy"
+# csv.writer writes None as an unquoted empty field, which COPY CSV reads as NULL
+# (empty strings never reach COPY: clean_series turns them into None)
+COPY_NULL = ""
+
+# Rows are cleaned, turned into tuples and sent per batch (one connection, one commit),
+# so only BATCH_SIZE cleaned rows / tuples are in memory at a time
+BATCH_SIZE = 5000
+
+# Columns of a batch are cleaned in parallel (pyarrow.compute releases the GIL)
+CLEAN_WORKERS = min(EXPECTED_COLUMNS, os.cpu_count() or 1)
+
+# Batches cleaned ahead on a background thread while the current one is being sent
+PREFETCH_BATCHES = 2
+# How often (seconds) a producer blocked on a full queue checks whether the consumer is gone
+PREFETCH_PUT_TIMEOUT = 0.5
+
+# execute_values fallback: rows per multi-row INSERT ... VALUES statement
+# (= BATCH_SIZE, so each batch is a single statement / round-trip)
+VALUES_PAGE_SIZE = BATCH_SIZE
+
+# Connections are reused from one pool for the whole process (no TLS + auth
+# handshake per insert call when this module is driven by an orchestrator)
+POOL_MIN_CONNECTIONS = 1
+POOL_MAX_CONNECTIONS = 8
+APPLICATION_NAME = "verifiedDealers"
+CONNECTION_POOL = None
+
 # ==============================================================================
 # 2. Helpers
 # ==============================================================================
 
-def clean_value(value):
-    """Clean Excel junk values"""
-    if pd.isna(value):
-        return None
+# Precompiled once instead of per cell
+TRAILING_ZERO_RE = re.compile(r'\.0$')
+NULL_STRINGS = frozenset({"", "nan", "none", "n/a", "null"})
+NULL_STRINGS_ARROW = pa.array(sorted(NULL_STRINGS))
+
+def read_excel_cached(file_path, **read_kwargs):
+    """pd.read_excel, cached as Parquet next to the workbook until the workbook changes"""
+    key = hashlib.sha1(repr(sorted(read_kwargs.items())).encode()).hexdigest()[:8]
+    cache_path = f"{file_path}.{key}.parquet"
+
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(file_path):
+        try:
+            df = pd.read_parquet(cache_path)
+        except Exception as e:
+            # unreadable (e.g. truncated) cache: re-read the workbook and rewrite it
+            print("WARNING: Parquet cache not readable, re-reading the workbook:", e)
+        else:
+            print(f"Using cached Parquet copy: {cache_path}")
+
+            text_cols = df.select_dtypes("string").columns
+            df[text_cols] = df[text_cols].astype(object).where(df[text_cols].notna(), None)
 
-    value_str = str(value).strip()
+            return df
 
-    if value_str.lower() == "nan" or value_str == "":
-        return None
+    df = pd.read_excel(file_path, **read_kwargs)
+    df.columns = df.columns.map(str)
+
+    # write to a temp file and swap it in, so an interrupted write leaves no partial cache
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+
+    try:
+        # mixed-type columns are cached as text; cleaning stringifies them anyway
+        object_cols = df.select_dtypes("object").columns
+        df.astype({col: "string" for col in object_cols}).to_parquet(tmp_path, compression="zstd")
+        os.replace(tmp_path, cache_path)
+    except (ImportError, ValueError, TypeError, OSError) as e:
+        print("WARNING: Parquet cache not written:", e)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return df
+
+
+def clean_series(series):
+    """Clean Excel junk values in a whole column; stays Arrow-backed, missing -> <NA>"""
+    # one pyarrow.compute pipeline per column: no Python call per cell
+    values = pa.array(series.astype("string[pyarrow]"))
+    values = pc.utf8_trim_whitespace(values)
+
+    is_junk = pc.is_in(pc.utf8_lower(values), value_set=NULL_STRINGS_ARROW)
+    values = pc.if_else(is_junk, pa.scalar(None, pa.string()), values)
 
     # remove .0 from numbers stored as float
-    value_str = re.sub(r'\.0$', '', value_str)
+    values = pc.replace_substring_regex(values, TRAILING_ZERO_RE.pattern, "")
 
-    return value_str
+    return pd.Series(pd.arrays.ArrowStringArray(values), index=series.index)
 
 
-def clean_boolean(value):
-    """Convert excel boolean-like values"""
-    if pd.isna(value):
-        return None
+class RecordBatchStream(io.RawIOBase):
+    """Read-only byte stream that CSV-encodes the next record batch only when COPY asks for more"""
 
-    val = str(value).strip().lower()
+    def __init__(self, record_batches):
+        self.record_batches = iter(record_batches)
+        self.pending = memoryview(b"")
+        self.rows = 0
 
-    if val in ["true", "yes", "1"]:
+    def readable(self):
         return True
-    if val in ["false", "no", "0"]:
+
+    def readinto(self, buf):
+        while not self.pending:
+            data_to_insert = next(self.record_batches, None)
+            if data_to_insert is None:
+                return 0
+
+            print(f"Inserting {len(data_to_insert)} rows...")
+            text = io.StringIO()
+            csv.writer(text, quoting=csv.QUOTE_MINIMAL, lineterminator="\n").writerows(data_to_insert)
+            self.pending = memoryview(text.getvalue().encode("utf-8"))
+            self.rows += len(data_to_insert)
+
+        size = min(len(buf), len(self.pending))
+        buf[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+
+def copy_records(cursor, record_batches):
+    """Stream all batches into TARGET_TABLE with a single COPY FROM STDIN; returns the row count"""
+    stream = RecordBatchStream(record_batches)
+
+    column_list = ", ".join([f'"{col}"' for col in TARGET_COLUMNS])
+    copy_query = f"COPY {TARGET_TABLE} ({column_list}) FROM STDIN WITH (FORMAT CSV, NULL '{COPY_NULL}')"
+    cursor.copy_expert(copy_query, stream)
+
+    return stream.rows
+
+
+def unnest_records(cursor, data_to_insert):
+    """Insert one batch with INSERT ... SELECT FROM UNNEST, sending each column as a single array"""
+    column_list = ", ".join([f'"{col}"' for col in TARGET_COLUMNS])
+    arrays = ", ".join(["%s::text[]"] * EXPECTED_COLUMNS)
+
+    # rows -> columns; lists (not tuples) so psycopg2 adapts them as ARRAY[...]
+    column_values = [list(values) for values in zip(*data_to_insert)]
+
+    cursor.execute(
+        f"INSERT INTO {TARGET_TABLE} ({column_list}) SELECT * FROM UNNEST({arrays})",
+        column_values
+    )
+
+
+def clean_batch(chunk, executor):
+    """Clean one slice of the raw sheet into a new frame in TARGET_COLUMNS order, one column per worker"""
+    cleaned = executor.map(clean_series, [chunk[col] for col in TARGET_COLUMNS])
+
+    return pd.DataFrame(dict(zip(TARGET_COLUMNS, cleaned)))
+
+
+def iter_record_batches(df):
+    """Clean and yield lists of at most BATCH_SIZE rows in TARGET_COLUMNS order, lazily"""
+    with ThreadPoolExecutor(max_workers=CLEAN_WORKERS) as executor:
+        for start in range(0, len(df), BATCH_SIZE):
+            records = clean_batch(df.iloc[start:start + BATCH_SIZE], executor)
+
+            # every row has exactly EXPECTED_COLUMNS values
+            assert records.shape[1] == EXPECTED_COLUMNS
+
+            # drop rows without the required fields in one vectorized pass
+            records = records.dropna(subset=REQUIRED_COLUMNS)
+            if records.empty:
+                continue
+
+            # one object ndarray -> list of row lists (no per-row namedtuple/Series);
+            # Arrow strings become Python objects only here, with <NA> -> None
+            yield records.to_numpy(dtype=object, na_value=None).tolist()
+
+
+def prefetch_batches(record_batches, depth=PREFETCH_BATCHES):
+    """Run the batch generator on a producer thread so cleaning overlaps with the DB load"""
+    batches = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        # False once the consumer is closed (e.g. COPY failed and stopped reading)
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=PREFETCH_PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                pass
         return False
 
-    return None
+    def produce():
+        try:
+            for batch in record_batches:
+                if not put(batch):
+                    break
+            else:
+                put(done)
+        except Exception as e:
+            put(e)
+        finally:
+            # stops iter_record_batches early: shuts its cleaning pool, drops the frame
+            close = getattr(record_batches, "close", None)
+            if close:
+                close()
+
+    threading.Thread(target=produce, daemon=True).start()
+
+    try:
+        while True:
+            batch = batches.get()
+            if batch is done:
+                return
+            if isinstance(batch, Exception):
+                raise batch
+            yield batch
+    finally:
+        stop.set()
+
 
+def get_connection_pool(db_url):
+    """Create the process-wide ThreadedConnectionPool on first use"""
+    global CONNECTION_POOL
 
-def insert_data_to_neon(data_to_insert, db_url):
+    if CONNECTION_POOL is None:
+        print("Connecting to Neon...")
+        CONNECTION_POOL = pool.ThreadedConnectionPool(
+            POOL_MIN_CONNECTIONS,
+            POOL_MAX_CONNECTIONS,
+            db_url,
+            application_name=APPLICATION_NAME  # SSL settings come from DATABASE_URL
+        )
+
+    return CONNECTION_POOL
+
+
+def insert_data_to_neon(record_batches, db_url):
     conn = None
+    connection_pool = None
 
     try:
-        print("Connecting to Neon...")
-        conn = psycopg2.connect(db_url)
+        connection_pool = get_connection_pool(db_url)
+        conn = connection_pool.getconn()
         conn.autocommit = False
         cursor = conn.cursor()
 
-        column_list = ", ".join([f'"{col}"' for col in TARGET_COLUMNS])
-        placeholders = ", ".join(["%s"] * EXPECTED_COLUMNS)
+        # bulk load: no WAL flush wait at commit, scoped to this transaction
+        cursor.execute("SET LOCAL synchronous_commit = OFF")
 
+        column_list = ", ".join([f'"{col}"' for col in TARGET_COLUMNS])
         insert_query = f"""
         INSERT INTO {TARGET_TABLE} ({column_list})
-        VALUES ({placeholders})
+        VALUES %s
         """
 
-        print(f"Inserting {len(data_to_insert)} rows...")
-        extras.execute_batch(cursor, insert_query, data_to_insert)
+        total_inserted = 0
+
+        if LOAD_METHOD == "copy":
+            # batches are cleaned and encoded while COPY is sending the previous ones
+            total_inserted = copy_records(cursor, record_batches)
+        else:
+            for data_to_insert in record_batches:
+                print(f"Inserting {len(data_to_insert)} rows...")
+                if LOAD_METHOD == "unnest":
+                    unnest_records(cursor, data_to_insert)
+                else:
+                    extras.execute_values(cursor, insert_query, data_to_insert, page_size=VALUES_PAGE_SIZE)
+                total_inserted += len(data_to_insert)
 
         conn.commit()
-        print("SUCCESS: Insert complete.")
+        print(f"SUCCESS: Insert complete ({total_inserted} rows).")
 
     except psycopg2.Error as e:
         print("DATABASE ERROR:", e)
@@ -94,9 +334,15 @@ def insert_data_to_neon(data_to_insert, db_url):
             conn.rollback()
 
     finally:
+        # a failed load leaves the batch generator unfinished; close it so the
+        # prefetch_batches producer thread exits
+        close_batches = getattr(record_batches, "close", None)
+        if close_batches:
+            close_batches()
+
         if conn:
-            conn.close()
-            print("Connection closed.")
+            connection_pool.putconn(conn)
+            print("Connection returned to pool.")
 
 
 # ==============================================================================
@@ -114,71 +360,24 @@ if __name__ == "__main__":
 
     print("Reading Excel...")
 
-    df = pd.read_excel(
+    df = read_excel_cached(
         FILE_PATH,
         sheet_name=SHEET_NAME,
         skiprows=START_ROW_TO_SKIP,
-        engine="openpyxl"
+        usecols=list(EXCEL_COLUMNS),  # other sheet columns are never parsed
+        engine="calamine"  # python-calamine (Rust) instead of pure-Python openpyxl
     )
 
-    # --- Rename columns from Excel → DB format ---
-    df = df.rename(columns={
-        "dealerCode": "dealer_code",
-        "dealerCategory": "dealer_category",
-        "isSubdealer": "is_subdealer",
-        "dealerPartyName": "dealer_party_name",
-        "contactNo1": "contact_no1",
-        "contactNo2": "contact_no2",
-        "pinCode": "pin_code",
-        "relatedSpName": "related_sp_name",
-        "ownerProprietorName": "owner_proprietor_name",
-        "natureOfFirm": "nature_of_firm",
-        "gstNo": "gst_no",
-        "panNo": "pan_no"
-    })
-
-    # --- Clean columns ---
-    string_cols = [
-        "dealer_code","dealer_category","dealer_party_name",
-        "zone","area","contact_no1","contact_no2",
-        "email","address","pin_code","related_sp_name",
-        "owner_proprietor_name","nature_of_firm",
-        "gst_no","pan_no"
-    ]
-
-    for col in string_cols:
-        df[col] = df[col].apply(clean_value)
-
-    df["is_subdealer"] = df["is_subdealer"].apply(clean_boolean)
-
-    # --- Build records ---
-    records_to_insert = []
-
-    for _, row in df.iterrows():
-
-        data_tuple = (
-            row["dealer_code"],
-            row["dealer_category"],
-            row["is_subdealer"],
-            row["dealer_party_name"],
-            row["zone"],
-            row["area"],
-            row["contact_no1"],
-            row["contact_no2"],
-            row["email"],
-            row["address"],
-            row["pin_code"],
-            row["related_sp_name"],
-            row["owner_proprietor_name"],
-            row["nature_of_firm"],
-            row["gst_no"],
-            row["pan_no"],
-        )
-
-        if len(data_tuple) == EXPECTED_COLUMNS:
-            records_to_insert.append(data_tuple)
+    # --- Excel → DB column names, relabelled in place (no rename copy) ---
+    df.columns = df.columns.map(EXCEL_COLUMNS)
 
-    if records_to_insert:
-        insert_data_to_neon(records_to_insert, db_url)
+    # --- Clean + build records per batch (TARGET_COLUMNS order, one tuple per row),
+    #     up to PREFETCH_BATCHES ahead of the load ---
+    if len(df):
+        insert_data_to_neon(prefetch_batches(iter_record_batches(df)), db_url)
     else:
         print("No valid rows found.")
+
+    if CONNECTION_POOL is not None:
+        CONNECTION_POOL.closeall()
+        print("Connection pool closed.")
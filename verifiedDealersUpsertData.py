@@ -2,7 +2,6 @@ import pandas as pd
 import psycopg2
 import os
 from dotenv import load_dotenv
-import re
 import uuid
 
 # ==============================================================================
@@ -18,13 +17,31 @@ DEFAULT_USER_ID = 77  # Change if needed
 # HELPERS
 # ==============================================================================
 
+# Lookup sets built once instead of per cell
+NULL_STRINGS = frozenset({"", "nan", "none", "n/a", "null"})
+TRUE_STRINGS = frozenset({"true", "yes", "1"})
+FALSE_STRINGS = frozenset({"false", "no", "0"})
+
+# Names of the PREPAREd per-row statements (see deallocate_statements)
+PREPARED_STATEMENTS = [
+    "find_dealer_by_gst",
+    "insert_dealer",
+    "find_verified_by_gst",
+    "find_verified_by_name",
+    "update_verified_dealer",
+    "insert_verified_dealer",
+]
+NO_SP_NAMES = frozenset({"no sales promoter", "(no sales promoter)", "no sp", "n/a"})
+
 def clean_value(value):
     if pd.isna(value):
         return None
     value = str(value).strip()
-    if value.lower() == "nan" or value == "":
+    if value.lower() in NULL_STRINGS:
         return None
-    value = re.sub(r'\.0$', '', value)
+    # remove .0 from numbers stored as float (no regex per cell)
+    if value.endswith(".0"):
+        value = value[:-2]
     return value
 
 
@@ -32,9 +49,9 @@ def clean_boolean(value):
     if pd.isna(value):
         return None
     val = str(value).strip().lower()
-    if val in ["true", "yes", "1"]:
+    if val in TRUE_STRINGS:
         return True
-    if val in ["false", "no", "0"]:
+    if val in FALSE_STRINGS:
         return False
     return None
 
@@ -43,8 +60,21 @@ def clean_boolean(value):
 # MAIN PROCESSOR
 # ==============================================================================
 
+def deallocate_statements(cursor):
+    # PREPAREd statements are session-level and survive COMMIT/ROLLBACK. Through Neon's
+    # transaction-mode pooler the backend outlives this client, so the next run landing on
+    # it would fail with "prepared statement already exists" unless they are dropped.
+    cursor.execute(
+        "SELECT name FROM pg_prepared_statements WHERE name = ANY(%s)",
+        (PREPARED_STATEMENTS,)
+    )
+    for (name,) in cursor.fetchall():
+        cursor.execute(f"DEALLOCATE {name}")
+
+
 def process_verified_dealers(df, db_url):
     conn = None
+    cursor = None
 
     try:
         print("Connecting to DB...")
@@ -52,6 +82,12 @@ def process_verified_dealers(df, db_url):
         conn.autocommit = False
         cursor = conn.cursor()
 
+        # Commit without waiting for the WAL flush (this transaction only)
+        cursor.execute("SET LOCAL synchronous_commit = OFF")
+
+        # lets the error path leave the aborted state without ending the transaction
+        cursor.execute("SAVEPOINT before_load")
+
         # ==========================================================
         # STEP 0: Helper for valid SP
         # ==========================================================
@@ -59,12 +95,7 @@ def process_verified_dealers(df, db_url):
             if not name:
                 return False
             name_clean = name.strip().lower()
-            return name_clean not in [
-                "no sales promoter",
-                "(no sales promoter)",
-                "no sp",
-                "n/a"
-            ]
+            return name_clean not in NO_SP_NAMES
 
         # ==========================================================
         # STEP 1: PRELOAD SALES PROMOTERS
@@ -102,6 +133,91 @@ def process_verified_dealers(df, db_url):
                 sp_map[key] = cursor.fetchone()[0]
                 print(f"→ Added SP: {sp}")
 
+        # ==========================================================
+        # STEP 2B: PREPARE PER-ROW STATEMENTS
+        # Parsed/planned once on the server, then EXECUTEd per row
+        # ==========================================================
+        # drop leftovers from an earlier run on this (pooled) backend
+        deallocate_statements(cursor)
+
+        cursor.execute("""
+            PREPARE find_dealer_by_gst AS
+            SELECT id FROM bestcement.dealers
+            WHERE UPPER(TRIM(gstin_no)) = UPPER(TRIM($1))
+        """)
+
+        cursor.execute("""
+            PREPARE insert_dealer AS
+            INSERT INTO bestcement.dealers (
+                id, user_id, type, name, region, area,
+                phone_no, address, total_potential,
+                best_potential, brand_selling, feedbacks,
+                verification_status, gstin_no, pan_no
+            )
+            VALUES ($1, $2, 'Dealer-Best', $3, $4, $5,
+                    $6, $7, 0, 0, ARRAY[]::text[], '',
+                    'VERIFIED', $8, $9)
+        """)
+
+        cursor.execute("""
+            PREPARE find_verified_by_gst AS
+            SELECT id FROM bestcement.verified_dealers
+            WHERE UPPER(TRIM(gst_no)) = UPPER(TRIM($1))
+            LIMIT 1
+        """)
+
+        cursor.execute("""
+            PREPARE find_verified_by_name AS
+            SELECT id FROM bestcement.verified_dealers
+            WHERE LOWER(TRIM(dealer_party_name)) = LOWER(TRIM($1))
+            LIMIT 1
+        """)
+
+        cursor.execute("""
+            PREPARE update_verified_dealer AS
+            UPDATE bestcement.verified_dealers SET
+                contact_no1 = COALESCE($1, contact_no1),
+                contact_no2 = COALESCE($2, contact_no2),
+                email = COALESCE($3, email),
+                pin_code = COALESCE($4, pin_code),
+                gst_no = COALESCE($5, gst_no),
+                pan_no = COALESCE($6, pan_no),
+                zone = COALESCE($7, zone),
+                area = COALESCE($8, area),
+                district = COALESCE($9, district),
+                state = COALESCE($10, state),
+                dealer_segment = COALESCE($11, dealer_segment),
+                contact_person = COALESCE($12, contact_person),
+                security_blank_cheque_no = COALESCE($13, security_blank_cheque_no),
+                sales_promoter_id = COALESCE($14, sales_promoter_id),
+                dealer_uuid = COALESCE($15, dealer_uuid),
+                updated_at = NOW()
+            WHERE id = $16
+        """)
+
+        cursor.execute("""
+            PREPARE insert_verified_dealer AS
+            INSERT INTO bestcement.verified_dealers (
+                dealer_party_name,
+                contact_no1,
+                contact_no2,
+                email,
+                pin_code,
+                gst_no,
+                pan_no,
+                zone,
+                area,
+                district,
+                state,
+                dealer_segment,
+                contact_person,
+                security_blank_cheque_no,
+                sales_promoter_id,
+                dealer_uuid
+            )
+            VALUES ($1,$2,$3,$4,$5,$6,$7,$8,$9,$10,$11,$12,$13,$14,$15,$16)
+        """)
+
         # ==========================================================
         # STEP 3: MAIN LOOP
         # ==========================================================
@@ -133,10 +249,7 @@ def process_verified_dealers(df, db_url):
                 existing = None
 
                 if gst_no:
-                    cursor.execute("""
-                        SELECT id FROM bestcement.dealers
-                        WHERE UPPER(TRIM(gstin_no)) = UPPER(TRIM(%s))
-                    """, (gst_no,))
+                    cursor.execute("EXECUTE find_dealer_by_gst (%s)", (gst_no,))
                     existing = cursor.fetchone()
 
                 if existing:
@@ -145,17 +258,7 @@ def process_verified_dealers(df, db_url):
                 else:
                     dealer_uuid = str(uuid.uuid4())
 
-                    cursor.execute("""
-                        INSERT INTO bestcement.dealers (
-                            id, user_id, type, name, region, area,
-                            phone_no, address, total_potential,
-                            best_potential, brand_selling, feedbacks,
-                            verification_status, gstin_no, pan_no
-                        )
-                        VALUES (%s, %s, 'Dealer-Best', %s, %s, %s,
-                                %s, %s, 0, 0, ARRAY[]::text[], '',
-                                'VERIFIED', %s, %s)
-                    """, (
+                    cursor.execute("EXECUTE insert_dealer (%s,%s,%s,%s,%s,%s,%s,%s,%s)", (
                         dealer_uuid,
                         DEFAULT_USER_ID,
                         dealer_name,
@@ -175,19 +278,11 @@ def process_verified_dealers(df, db_url):
             existing = None
 
             if gst_no:
-                cursor.execute("""
-                    SELECT id FROM bestcement.verified_dealers
-                    WHERE UPPER(TRIM(gst_no)) = UPPER(TRIM(%s))
-                    LIMIT 1
-                """, (gst_no,))
+                cursor.execute("EXECUTE find_verified_by_gst (%s)", (gst_no,))
                 existing = cursor.fetchone()
 
             if not existing:
-                cursor.execute("""
-                    SELECT id FROM bestcement.verified_dealers
-                    WHERE LOWER(TRIM(dealer_party_name)) = LOWER(TRIM(%s))
-                    LIMIT 1
-                """, (dealer_name,))
+                cursor.execute("EXECUTE find_verified_by_name (%s)", (dealer_name,))
                 existing = cursor.fetchone()
 
             # ==========================================================
@@ -196,26 +291,7 @@ def process_verified_dealers(df, db_url):
             if existing:
                 print("→ Updating existing verified dealer")
 
-                cursor.execute("""
-                    UPDATE bestcement.verified_dealers SET
-                        contact_no1 = COALESCE(%s, contact_no1),
-                        contact_no2 = COALESCE(%s, contact_no2),
-                        email = COALESCE(%s, email),
-                        pin_code = COALESCE(%s, pin_code),
-                        gst_no = COALESCE(%s, gst_no),
-                        pan_no = COALESCE(%s, pan_no),
-                        zone = COALESCE(%s, zone),
-                        area = COALESCE(%s, area),
-                        district = COALESCE(%s, district),
-                        state = COALESCE(%s, state),
-                        dealer_segment = COALESCE(%s, dealer_segment),
-                        contact_person = COALESCE(%s, contact_person),
-                        security_blank_cheque_no = COALESCE(%s, security_blank_cheque_no),
-                        sales_promoter_id = COALESCE(%s, sales_promoter_id),
-                        dealer_uuid = COALESCE(%s, dealer_uuid),
-                        updated_at = NOW()
-                    WHERE id = %s
-                """, (
+                cursor.execute("EXECUTE update_verified_dealer (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)", (
                     clean_value(row.get("contact_no1")),
                     clean_value(row.get("contact_no2")),
                     clean_value(row.get("email")),
@@ -240,27 +316,7 @@ def process_verified_dealers(df, db_url):
             else:
                 print("→ Inserting new verified dealer")
 
-                cursor.execute("""
-                    INSERT INTO bestcement.verified_dealers (
-                        dealer_party_name,
-                        contact_no1,
-                        contact_no2,
-                        email,
-                        pin_code,
-                        gst_no,
-                        pan_no,
-                        zone,
-                        area,
-                        district,
-                        state,
-                        dealer_segment,
-                        contact_person,
-                        security_blank_cheque_no,
-                        sales_promoter_id,
-                        dealer_uuid
-                    )
-                    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                """, (
+                cursor.execute("EXECUTE insert_verified_dealer (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)", (
                     dealer_name,
                     clean_value(row.get("contact_no1")),
                     clean_value(row.get("contact_no2")),
@@ -279,11 +335,20 @@ def process_verified_dealers(df, db_url):
                     dealer_uuid
                 ))
 
+        deallocate_statements(cursor)
         conn.commit()
         print("\n✅ SUCCESS: Clean upsert completed")
 
     except Exception as e:
         print("\n❌ ERROR:", e)
+        if cursor is not None:
+            try:
+                # still inside the transaction (same backend under a transaction-mode
+                # pooler): undo the failed work, then drop the prepared statements
+                cursor.execute("ROLLBACK TO SAVEPOINT before_load")
+                deallocate_statements(cursor)
+            except psycopg2.Error as cleanup_error:
+                print("Could not deallocate prepared statements:", cleanup_error)
         if conn:
             conn.rollback()
 
@@ -307,7 +372,11 @@ if __name__ == "__main__":
 
     print("Reading Excel...")
 
-    df = pd.read_excel(FILE_PATH, sheet_name=SHEET_NAME, engine="openpyxl")
+    df = pd.read_excel(
+        FILE_PATH,
+        sheet_name=SHEET_NAME,
+        engine="calamine"  # python-calamine (Rust) instead of pure-Python openpyxl
+    )
 
     df = df.rename(columns={
         "dealerCode": "dealer_code",
@@ -2,7 +2,6 @@ import pandas as pd
 import psycopg2
 import os
 from dotenv import load_dotenv
-import re
 import uuid
 
 # ==============================================================================
@@ -18,13 +17,28 @@ DEFAULT_USER_ID = 77  # Change if needed
 # HELPERS
 # ==============================================================================
 
+# Lookup sets built once instead of per cell
+NULL_STRINGS = frozenset({"", "nan", "none", "n/a", "null"})
+TRUE_STRINGS = frozenset({"true", "yes", "1"})
+FALSE_STRINGS = frozenset({"false", "no", "0"})
+
+# Names of the PREPAREd per-row statements (see deallocate_statements)
+PREPARED_STATEMENTS = [
+    "find_dealer_by_gst",
+    "insert_dealer",
+    "find_verified_by_gst",
+    "insert_verified_dealer",
+]
+
 def clean_value(value):
     if pd.isna(value):
         return None
     value = str(value).strip()
-    if value.lower() == "nan" or value == "":
+    if value.lower() in NULL_STRINGS:
         return None
-    value = re.sub(r'\.0$', '', value)
+    # remove .0 from numbers stored as float (no regex per cell)
+    if value.endswith(".0"):
+        value = value[:-2]
     return value
 
 
@@ -32,9 +46,9 @@ def clean_boolean(value):
     if pd.isna(value):
         return None
     val = str(value).strip().lower()
-    if val in ["true", "yes", "1"]:
+    if val in TRUE_STRINGS:
         return True
-    if val in ["false", "no", "0"]:
+    if val in FALSE_STRINGS:
         return False
     return None
 
@@ -43,8 +57,21 @@ def clean_boolean(value):
 # MAIN PROCESSOR
 # ==============================================================================
 
+def deallocate_statements(cursor):
+    # PREPAREd statements are session-level and survive COMMIT/ROLLBACK. Through Neon's
+    # transaction-mode pooler the backend outlives this client, so the next run landing on
+    # it would fail with "prepared statement already exists" unless they are dropped.
+    cursor.execute(
+        "SELECT name FROM pg_prepared_statements WHERE name = ANY(%s)",
+        (PREPARED_STATEMENTS,)
+    )
+    for (name,) in cursor.fetchall():
+        cursor.execute(f"DEALLOCATE {name}")
+
+
 def process_verified_dealers(df, db_url):
     conn = None
+    cursor = None
 
     try:
         print("Connecting to Neon...")
@@ -52,6 +79,108 @@ def process_verified_dealers(df, db_url):
         conn.autocommit = False
         cursor = conn.cursor()
 
+        cursor.execute("SET LOCAL synchronous_commit = OFF")  # async commit for this load
+
+        # lets the error path leave the aborted state without ending the transaction
+        cursor.execute("SAVEPOINT before_load")
+
+        # ==========================================================
+        # PREPARE PER-ROW STATEMENTS
+        # Parsed/planned once on the server, then EXECUTEd per row
+        # ==========================================================
+        # drop leftovers from an earlier run on this (pooled) backend
+        deallocate_statements(cursor)
+
+        cursor.execute(
+            """
+            PREPARE find_dealer_by_gst AS
+            SELECT id
+            FROM dealers
+            WHERE UPPER(TRIM(gstin_no)) = UPPER(TRIM($1))
+            """
+        )
+
+        cursor.execute(
+            """
+            PREPARE insert_dealer AS
+            INSERT INTO dealers (
+                id,
+                user_id,
+                type,
+                name,
+                region,
+                area,
+                phone_no,
+                address,
+                total_potential,
+                best_potential,
+                brand_selling,
+                feedbacks,
+                verification_status,
+                gstin_no,
+                pan_no
+            )
+            VALUES (
+                $1,
+                $2,
+                'Dealer-Best',
+                $3,
+                $4,
+                $5,
+                $6,
+                $7,
+                0,
+                0,
+                ARRAY[]::text[],
+                '',
+                'VERIFIED',
+                $8,
+                $9
+            )
+            RETURNING id
+            """
+        )
+
+        cursor.execute(
+            """
+            PREPARE find_verified_by_gst AS
+            SELECT id FROM verified_dealers
+            WHERE UPPER(TRIM(gst_no)) = UPPER(TRIM($1))
+            """
+        )
+
+        cursor.execute(
+            """
+            PREPARE insert_verified_dealer AS
+            INSERT INTO verified_dealers (
+                dealer_party_name,
+                contact_no1,
+                contact_no2,
+                email,
+                pin_code,
+                gst_no,
+                pan_no,
+                credit_limit,
+                credit_days_allowed,
+                zone,
+                area,
+                sales_man_name_raw,
+                alias,
+                district,
+                state,
+                dealer_segment,
+                contact_person,
+                security_blank_cheque_no,
+                sales_promoter_id,
+                dealer_uuid
+            )
+            VALUES (
+                $1,$2,$3,$4,$5,$6,$7,$8,$9,$10,
+                $11,$12,$13,$14,$15,$16,$17,$18,$19,$20
+            )
+            """
+        )
+
         for _, row in df.iterrows():
 
             dealer_name = clean_value(row.get("dealer_party_name"))
@@ -88,14 +217,7 @@ def process_verified_dealers(df, db_url):
                 existing = None
 
                 if gst_no:
-                    cursor.execute(
-                        """
-                        SELECT id
-                        FROM dealers
-                        WHERE UPPER(TRIM(gstin_no)) = UPPER(TRIM(%s))
-                        """,
-                        (gst_no,)
-                    )
+                    cursor.execute("EXECUTE find_dealer_by_gst (%s)", (gst_no,))
                     existing = cursor.fetchone()
 
                 if existing:
@@ -106,45 +228,7 @@ def process_verified_dealers(df, db_url):
 
                     new_id = str(uuid.uuid4())
 
-                    insert_dealer_query = """
-                    INSERT INTO dealers (
-                        id,
-                        user_id,
-                        type,
-                        name,
-                        region,
-                        area,
-                        phone_no,
-                        address,
-                        total_potential,
-                        best_potential,
-                        brand_selling,
-                        feedbacks,
-                        verification_status,
-                        gstin_no,
-                        pan_no
-                    )
-                    VALUES (
-                        %s,
-                        %s,
-                        'Dealer-Best',
-                        %s,
-                        %s,
-                        %s,
-                        %s,
-                        %s,
-                        0,
-                        0,
-                        ARRAY[]::text[],
-                        '',
-                        'VERIFIED',
-                        %s,
-                        %s
-                    )
-                    RETURNING id;
-                    """
-
-                    cursor.execute(insert_dealer_query, (
+                    cursor.execute("EXECUTE insert_dealer (%s,%s,%s,%s,%s,%s,%s,%s,%s)", (
                         new_id,
                         DEFAULT_USER_ID,
                         dealer_name,
@@ -164,13 +248,7 @@ def process_verified_dealers(df, db_url):
             # ==========================================================
 
             if gst_no:
-                cursor.execute(
-                    """
-                    SELECT id FROM verified_dealers
-                    WHERE UPPER(TRIM(gst_no)) = UPPER(TRIM(%s))
-                    """,
-                    (gst_no,)
-                )
+                cursor.execute("EXECUTE find_verified_by_gst (%s)", (gst_no,))
                 if cursor.fetchone():
                     print("→ Verified dealer already exists. Skipping insert.")
                     continue
@@ -179,36 +257,7 @@ def process_verified_dealers(df, db_url):
             # Insert into verified_dealers
             # ==========================================================
 
-            insert_verified_query = """
-            INSERT INTO verified_dealers (
-                dealer_party_name,
-                contact_no1,
-                contact_no2,
-                email,
-                pin_code,
-                gst_no,
-                pan_no,
-                credit_limit,
-                credit_days_allowed,
-                zone,
-                area,
-                sales_man_name_raw,
-                alias,
-                district,
-                state,
-                dealer_segment,
-                contact_person,
-                security_blank_cheque_no,
-                sales_promoter_id,
-                dealer_uuid
-            )
-            VALUES (
-                %s,%s,%s,%s,%s,%s,%s,%s,%s,%s,
-                %s,%s,%s,%s,%s,%s,%s,%s,%s,%s
-            );
-            """
-
-            cursor.execute(insert_verified_query, (
+            cursor.execute("EXECUTE insert_verified_dealer (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)", (
                 dealer_name,
                 clean_value(row.get("contact_no1")),
                 clean_value(row.get("contact_no2")),
@@ -231,11 +280,20 @@ def process_verified_dealers(df, db_url):
                 dealer_uuid
             ))
 
+        deallocate_statements(cursor)
         conn.commit()
         print("\nSUCCESS: All dealers processed.")
 
     except Exception as e:
         print("\nERROR:", e)
+        if cursor is not None:
+            try:
+                # still inside the transaction (same backend under a transaction-mode
+                # pooler): undo the failed work, then drop the prepared statements
+                cursor.execute("ROLLBACK TO SAVEPOINT before_load")
+                deallocate_statements(cursor)
+            except psycopg2.Error as cleanup_error:
+                print("Could not deallocate prepared statements:", cleanup_error)
         if conn:
             conn.rollback()
             print("Transaction rolled back.")
@@ -261,7 +319,11 @@ if __name__ == "__main__":
 
     print("Reading Excel...")
 
-    df = pd.read_excel(FILE_PATH, sheet_name=SHEET_NAME, engine="openpyxl")
+    df = pd.read_excel(
+        FILE_PATH,
+        sheet_name=SHEET_NAME,
+        engine="calamine"  # python-calamine (Rust) instead of pure-Python openpyxl
+    )
 
     df = df.rename(columns={
         "dealerCode": "dealer_code",